@@ -1,80 +1,185 @@
 # CFD Bottleneck Estimator
 # This program estimates the primary hardware bottlenecks for an OpenFOAM CFD simulation
 # based on the number of cells and user-provided hardware specifications.
+# Requires Python 3.10 or newer (HardwareSpec uses slotted dataclasses).
+
+import sys
+from bisect import bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from math import ceil
+from numbers import Number
+
+
+# ----- Define Hardware Specification ------------------------------------------------------------------------------- #
+
+@dataclass(frozen=True, slots=True)
+class HardwareSpec:
+    num_cells: int  # Number of cells in the CFD simulation
+    ram_capacity_gb: float  # RAM Capacity in gigabyte
+    num_ram_channels: int  # Total number of RAM channels across all processors
+    ram_speed_mts: float  # RAM speed in mega transfers per second
+    num_cpu_cores: int  # Number of CPU cores per processor
+    cpu_speed_ghz: float  # CPU clock-speed in gigahertz
+    cpu_l3_cache_capacity_mb: float  # Size of the CPU L3 cache per processor in megabytes
+    gpu_vram_gb: float  # Virtual memory of the graphics card in gigabytes
+    num_processors: int = 1  # Number of physical processors
+    numa_aware_placement: bool = False  # Whether memory is placed first-touch or interleaved across processors
+    ccx_per_processor: int = 1  # Number of core complexes (CCX) sharing an L3 cache, e.g. 1 for monolithic dies
+
 
 # ----- Define Constants -------------------------------------------------------------------------------------------- #
 
-num_cells = NUM_CELLS = 10_000_000  # Number of cells in the CFD simulation
-RAM_CAPACITY_GB = 64  # RAM Capacity in gigabyte
-NUM_RAM_CHANNELS = 4  # Number of RAM channels
-RAM_SPEED_MTS = 2133  # RAM speed in mega transfers per second
-NUM_PROCESSORS = 2  # Number of physical processors
-CPU_SPEED_GHZ = 2.2  # CPU clock-speed in gigahertz
-NUM_CPU_CORES_PER_PROCESSOR = 10  # Number of CPU cores
-L3_CACHE_CAPACITY_MB_PER_PROCESSOR = 25  # Size of the CPU L3 cache in megabytes
-GPU_VRAM_GB = 0  # Virtual memory of the graphics card in gigabytes
+# Edit these values to match the simulation and the hardware it will run on (see HardwareSpec for units)
+HARDWARE = HardwareSpec(
+    num_cells=10_000_000,
+    ram_capacity_gb=64,
+    num_ram_channels=4,
+    ram_speed_mts=2133,
+    num_processors=2,
+    cpu_speed_ghz=2.2,
+    num_cpu_cores=10,
+    cpu_l3_cache_capacity_mb=25,
+    ccx_per_processor=1,
+    gpu_vram_gb=0,
+    numa_aware_placement=False)
+
+
+# ----- Define Check Titles ----------------------------------------------------------------------------------------- #
+
+# Titles of the checks in the order they are evaluated by evaluate_cfd_requirements
+_TITLES = (
+    'RAM Capacity (GB)',
+    'RAM Channels',
+    'RAM BW per Core (GB/s)',
+    'CPU Cores',
+    'CPU Clock-Speed (GHZ)',
+    'L3 Cache per CCX (MB)',
+    'Virtual RAM (GB)')
+# Positions of the checks within _TITLES and the evaluated results
+_RAM_CAPACITY, _RAM_CHANNELS, _RAM_BANDWIDTH, _CPU_COUNT, _CPU_SPEED, _CPU_L3_CACHE, _GPU_VRAM = range(len(_TITLES))
+# Checks that can limit the solver; the VRAM figure is a rendering recommendation and never binds a simulation
+_SOLVER_CHECKS = tuple(i for i in range(len(_TITLES)) if i != _GPU_VRAM)
+# Report line layout, with the title column sized to the longest title
+_TITLE_W = max(map(len, _TITLES))
+_FMT = f'{{:<{_TITLE_W}}} Actual: {{:<10}} Target: {{:<10}} {{:<5}} {{:<5}}'.format
 
 
 # ----- Define Functions -------------------------------------------------------------------------------------------- #
 
 def estimate_bottleneck_cpu_count(num_cells, num_processors, num_cpu_cores):
     # There should be approximately between 50,000 and 100,000 cells per core
+    max_cells_per_core = 100_000
+    required_num_cores = num_cells / max_cells_per_core
+    return num_cpu_cores * num_processors, required_num_cores
+
+
+def estimate_cpu_core_limit(num_cells, num_processors, num_cpu_cores):
+    # Below approximately 50,000 cells per core the communication overhead outweighs the gain of an extra core
     min_cells_per_core = 50_000
     actual_cells_per_core = num_cells / (num_cpu_cores * num_processors)
     min_ratio_cpu_count = min_cells_per_core / actual_cells_per_core
     if min_ratio_cpu_count > 1:
-        print(f"Do not use all cores for computing. Limit the simulation to {round(num_cells / min_ratio_cpu_count)}")
-    max_cells_per_core = 100_000
-    required_num_cores = num_cells / max_cells_per_core
-    return checked_requirements('CPU Cores', num_cpu_cores * num_processors, required_num_cores)
+        return f"Do not use all cores for computing. Limit the simulation to {round(num_cells / min_ratio_cpu_count)}"
+    return None
 
 
 def estimate_bottleneck_cpu_speed(cpu_speed_ghz):
     # OpenFOAM solvers scale weakly with clock speed. Speeds between 1.5 and 2.0 GHz are acceptable, but faster clocks
     # reduce iteration time almost linearly up to ~3.5 GHz. A baseline ratio can be set against 3.0 GHz as reference.
     reference_ghz = 3.0
-    return checked_requirements('CPU Clock-Speed (GHZ)', cpu_speed_ghz, reference_ghz)
+    return cpu_speed_ghz, reference_ghz
 
 
-def estimate_bottleneck_cpu_l3_cache(num_cpu_cores, num_cores, cpu_l3_cache_capacity_mb):
+def estimate_bottleneck_cpu_l3_cache(num_cores, l3_mb, ccx_count=1):
     # Performance drops when the working set spills beyond the L3 cache. For SIMPLE steady-state simulations around 100
     # bytes per cell are reused per iteration. Only a fraction fits in cache, but ≥2 MB / core is a practical baseline.
+    # The L3 cache is shared by the cores of a die or core complex (CCX), so on chiplet CPUs the slice per CCX has to
+    # serve the cores of that CCX only. When the cores do not split evenly, the busiest CCX sets the requirement.
+    # An extra 10 % is reserved for data other than the cell fields.
+    if ccx_count < 1:
+        raise ValueError(f'There must be at least one CCX per processor, got {ccx_count}')
     reference_mb_per_core = 2
-    required_cache_mb = num_cpu_cores * num_cores * reference_mb_per_core
-    return checked_requirements('CPU L3 Cache (MB)', cpu_l3_cache_capacity_mb, required_cache_mb)
+    headroom = 1.1
+    cores_per_ccx = ceil(num_cores / ccx_count)
+    l3_per_ccx_mb = l3_mb / ccx_count
+    required_cache_mb = cores_per_ccx * reference_mb_per_core * headroom
+    return l3_per_ccx_mb, required_cache_mb
 
 
 def estimate_bottleneck_ram_capacity(num_cells, actual_ram_capacity_gb):
     # Approximate requirements are 1.5 to 4.0 GB of RAM per million cells
     min_gb_ram_per_million_cells = 2.5
     required_ram_capacity_gb = (num_cells / 1_000_000) * min_gb_ram_per_million_cells
-    return checked_requirements('RAM Capacity (GB)', actual_ram_capacity_gb, required_ram_capacity_gb)
+    return actual_ram_capacity_gb, required_ram_capacity_gb
 
 
 def estimate_bottleneck_ram_channels(num_processors, num_cores, num_ram_channels):
     # Approximate requirements are 2-4 cores per channel
     max_cores_per_ram_channel = 4
     required_channels = (num_cores * num_processors) / max_cores_per_ram_channel
-    return checked_requirements('RAM Channels', num_ram_channels, required_channels)
+    return num_ram_channels, required_channels
+
+
+def sustained_ram_bandwidth_gbs(ram_speed_mts, num_ram_channels):
+    bytes_per_transfer = 8
+    theoretical_bandwidth_gbs = ram_speed_mts * 1e6 * bytes_per_transfer * num_ram_channels / 1e9
+    bandwidth_efficiency = 0.7  # Intel and AMD tuning guides noting ~65–75%
+    return theoretical_bandwidth_gbs * bandwidth_efficiency
+
+
+def local_ram_bandwidth_gbs(num_processors, ram_speed_mts, num_ram_channels):
+    # On multi-socket (NUMA) systems each processor streams from its own channels, so the worst-case socket sets the
+    # bandwidth its cores can draw on, even when the aggregate across all sockets looks sufficient.
+    if num_ram_channels < num_processors:
+        raise ValueError(f'Each of the {num_processors} processors needs at least one of its own RAM channels, '
+                         f'got {num_ram_channels} channels in total')
+    channels_per_socket = num_ram_channels // num_processors
+    return sustained_ram_bandwidth_gbs(ram_speed_mts, channels_per_socket)
 
 
 def estimate_bottleneck_ram_bandwidth(num_processors, num_cpu_cores, ram_speed_mts, num_ram_channels):
     # Published benchmarks (e.g. PRACE best practice guides, CFDDirect hardware studies) show solver performance
     # saturates when available memory bandwidth per core falls below ~1.5–2.5 GB/s.
     required_bandwidth_per_core_gbs = 2
-    bytes_per_transfer = 8
-    theoretical_bandwidth_gbs = ram_speed_mts * 1e6 * bytes_per_transfer * num_ram_channels / 1e9
-    bandwidth_efficiency = 0.7  # Intel and AMD tuning guides noting ~65–75%
-    actual_bandwidth_gbs = theoretical_bandwidth_gbs * bandwidth_efficiency
-    required_bandwidth_gbs = num_processors * num_cpu_cores * required_bandwidth_per_core_gbs
-    return checked_requirements('RAM Bandwidth (GB/s)', actual_bandwidth_gbs, required_bandwidth_gbs)
+    local_bandwidth_gbs = local_ram_bandwidth_gbs(num_processors, ram_speed_mts, num_ram_channels)
+    # Roofline view: the cores share the sustained bandwidth, so each core can stream at most bS / N. If that share is
+    # below what a core consumes, the solver is memory-bound; otherwise the cores themselves are the limit.
+    bandwidth_per_core_gbs = local_bandwidth_gbs / num_cpu_cores
+    return bandwidth_per_core_gbs, required_bandwidth_per_core_gbs
+
+
+def estimate_ram_bandwidth_summary(num_processors, ram_speed_mts, num_ram_channels):
+    aggregate_bandwidth_gbs = sustained_ram_bandwidth_gbs(ram_speed_mts, num_ram_channels)
+    local_bandwidth_gbs = local_ram_bandwidth_gbs(num_processors, ram_speed_mts, num_ram_channels)
+    return (f'Sustained RAM bandwidth is {aggregate_bandwidth_gbs:.1f} GB/s in aggregate and '
+            f'{local_bandwidth_gbs:.1f} GB/s on the worst-case processor')
+
+
+def worst_case_bandwidth_per_core_gbs(num_processors, num_cpu_cores, ram_speed_mts, num_ram_channels,
+                                      numa_aware_placement):
+    # Without first-touch or interleaved placement (e.g. numactl --interleave=all) all memory may land on the socket
+    # that allocated it, leaving every core to stream through that one socket's channels.
+    local_bandwidth_gbs = local_ram_bandwidth_gbs(num_processors, ram_speed_mts, num_ram_channels)
+    if num_processors > 1 and not numa_aware_placement:
+        return local_bandwidth_gbs / (num_processors * num_cpu_cores)
+    return local_bandwidth_gbs / num_cpu_cores
+
+
+def estimate_numa_placement(num_processors, num_cpu_cores, ram_speed_mts, num_ram_channels, numa_aware_placement):
+    if num_processors > 1 and not numa_aware_placement:
+        bandwidth_per_core_gbs = worst_case_bandwidth_per_core_gbs(
+            num_processors, num_cpu_cores, ram_speed_mts, num_ram_channels, numa_aware_placement)
+        return (f'Memory placement across the {num_processors} processors is unconfirmed. If it is neither first-touch '
+                f'nor interleaved, bandwidth per core may drop to {bandwidth_per_core_gbs:.2f} GB/s')
+    return None
 
 
 def estimate_gpu_vram_recommendations(num_cells, gpu_vram_gb):
     # For rendering, it can be useful to have 1 GB of VRAM per 12 million cells
     recommended_vram_gb_per_million_cells = 1 / 12
     recommended_vram_gb = num_cells / 1_000_000 * recommended_vram_gb_per_million_cells
-    return checked_requirements('Virtual RAM (GB)', gpu_vram_gb, recommended_vram_gb)
+    return gpu_vram_gb, recommended_vram_gb
 
 
 def estimate_storage_requirements(num_cells, write_speed_gbs, actual_storage_capacity_gb):
@@ -85,64 +190,102 @@ def estimate_storage_requirements(num_cells, write_speed_gbs, actual_storage_cap
           f'{space_requirements_gb} gigabytes to save')
 
 
-def checked_requirements(title, numerator, denominator):
-    ratio = numerator / denominator
-    mark = '[✗]' if ratio < 1 else '[✓]'
-    ratio_fmt = f'{round(ratio * 100)} %'
+_POW10 = (10, 100)  # Integer magnitudes at which one fewer decimal digit is shown
 
-    def fmt(val):
-        if isinstance(val, (int, float)):
-            if val == 0:
-                return "0"
-            digits = 3 - int(f"{int(abs(val))}".__len__())
-            digits = max(digits, 0)
-            return f"{val:,.{digits}f}"
-        return str(val)
 
-    actual_fmt = fmt(numerator)
-    target_fmt = fmt(denominator)
-    return ratio, ratio_fmt, title, actual_fmt, target_fmt, mark
+def fmt(val):
+    if isinstance(val, (int, float)):
+        if val == 0:
+            return "0"
+        # Two decimals below 10, one below 100 and none from 100 upwards
+        digits = 2 - bisect_right(_POW10, int(abs(val)))
+        return f"{val:,.{digits}f}"
+    return str(val)
 
 
-# ----- Define Main Function ---------------------------------------------------------------------------------------- #
+# ----- Define Evaluation Functions --------------------------------------------------------------------------------- #
 
-def estimate_cfd_requirements(
-        num_cells,
-        ram_capacity_gb,
-        num_ram_channels,
-        ram_speed_mts,
-        num_processors,
-        num_cpu_cores,
-        cpu_speed_ghz,
-        cpu_l3_cache_capacity_mb,
-        gpu_vram_gb):
-    functions = [
-        estimate_bottleneck_ram_capacity(num_cells, ram_capacity_gb),
-        estimate_bottleneck_ram_channels(num_processors, num_cpu_cores, num_ram_channels),
-        estimate_bottleneck_ram_bandwidth(num_processors, num_cpu_cores, ram_speed_mts, num_ram_channels),
+def evaluate_cfd_requirements(spec):
+    num_cells, num_processors, num_cpu_cores = spec.num_cells, spec.num_processors, spec.num_cpu_cores
+    actuals, targets = zip(
+        estimate_bottleneck_ram_capacity(num_cells, spec.ram_capacity_gb),
+        estimate_bottleneck_ram_channels(num_processors, num_cpu_cores, spec.num_ram_channels),
+        estimate_bottleneck_ram_bandwidth(num_processors, num_cpu_cores, spec.ram_speed_mts, spec.num_ram_channels),
         estimate_bottleneck_cpu_count(num_cells, num_processors, num_cpu_cores),
-        estimate_bottleneck_cpu_speed(cpu_speed_ghz),
-        estimate_bottleneck_cpu_l3_cache(num_processors, num_cpu_cores, cpu_l3_cache_capacity_mb),
-        estimate_gpu_vram_recommendations(num_cells, gpu_vram_gb)]
+        estimate_bottleneck_cpu_speed(spec.cpu_speed_ghz),
+        estimate_bottleneck_cpu_l3_cache(num_cpu_cores, spec.cpu_l3_cache_capacity_mb, spec.ccx_per_processor),
+        estimate_gpu_vram_recommendations(num_cells, spec.gpu_vram_gb))
+    ratios = [actual / target for actual, target in zip(actuals, targets)]
+    return actuals, targets, ratios
+
+
+def estimate_cfd_requirements_sweep(spec, **sweeps):
+    # Evaluate the checks for a series of configurations, e.g. num_cells=[1_000_000, 2_000_000], num_cpu_cores=[8, 16].
+    # Iterables of numbers (lists, ranges, generators, NumPy arrays, ...) are paired element-wise and must share a
+    # length, single numbers are applied to every configuration. Returns one row of ratios per configuration (ordered
+    # as _TITLES) and the title of the binding solver check of each row.
+    scalars, columns = {}, {}
+    for name, values in sweeps.items():
+        if isinstance(values, Number):
+            scalars[name] = values
+            continue
+        values = list(values) if isinstance(values, Iterable) and not isinstance(values, (str, bytes)) else None
+        if values is None or not all(isinstance(value, Number) for value in values):
+            raise ValueError(f'Swept value {name!r} must be a number or an iterable of numbers, '
+                             f'got {type(sweeps[name]).__name__}')
+        columns[name] = values
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f'Swept values must all have the same length, got lengths {sorted(lengths)}')
+    num_configs = lengths.pop() if lengths else 1
+    if num_configs == 0:
+        raise ValueError('Swept values must contain at least one configuration')
+
+    base_spec = replace(spec, **scalars)
+    ratios, bottlenecks = [], []
+    for row in range(num_configs):
+        _, _, row_ratios = evaluate_cfd_requirements(replace(base_spec, **{k: v[row] for k, v in columns.items()}))
+        ratios.append(row_ratios)
+        bottlenecks.append(_TITLES[min(_SOLVER_CHECKS, key=row_ratios.__getitem__)])
+    return ratios, bottlenecks
+
+
+# ----- Define Main Function ---------------------------------------------------------------------------------------- #
+
+def estimate_cfd_requirements(spec):
+    num_cells, num_processors, num_cpu_cores = spec.num_cells, spec.num_processors, spec.num_cpu_cores
+    ram_speed_mts, num_ram_channels = spec.ram_speed_mts, spec.num_ram_channels
+
+    # The estimators are pure arithmetic; the report is assembled here and written to stdout in one go
+    warnings = (
+        estimate_cpu_core_limit(num_cells, num_processors, num_cpu_cores),
+        estimate_numa_placement(num_processors, num_cpu_cores, ram_speed_mts, num_ram_channels,
+                                spec.numa_aware_placement))
+    lines = [f'Checking the various possible hardware bottlenecks for a simulation with {num_cells:,} cells']
+    lines += [warning for warning in warnings if warning is not None]
+
+    # All ratios are computed in a single pass; the values are only formatted once they are sorted
+    actuals, targets, ratios = evaluate_cfd_requirements(spec)
+
+    # The verdict follows the worst-case placement so it cannot contradict the NUMA warning above
+    worst_case_gbs = worst_case_bandwidth_per_core_gbs(
+        num_processors, num_cpu_cores, ram_speed_mts, num_ram_channels, spec.numa_aware_placement)
+    bound_kind = 'memory' if worst_case_gbs < targets[_RAM_BANDWIDTH] else 'compute'
+    placement_bound = actuals[_RAM_BANDWIDTH] >= targets[_RAM_BANDWIDTH] > worst_case_gbs
+    caveat = ' unless memory placement is NUMA-aware' if placement_bound else ''
 
-    functions = sorted(functions, key=lambda f: f[0])
+    for i in sorted(range(len(ratios)), key=ratios.__getitem__):
+        mark = '[✗]' if ratios[i] < 1 else '[✓]'
+        pct = int(ratios[i] * 100 + 0.5)  # Round halves up rather than to the nearest even percentage
+        ratio_fmt = f'{pct:d} %'
+        lines.append(_FMT(_TITLES[i], fmt(actuals[i]), fmt(targets[i]), ratio_fmt, mark))
 
-    for ratio, ratio_fmt, title, actual_fmt, target_fmt, mark in functions:
-        print(f'{title:<22} Actual: {actual_fmt:<10} Target: {target_fmt:<10} {ratio_fmt:<5} {mark:<5}')
+    lines.append(estimate_ram_bandwidth_summary(num_processors, ram_speed_mts, num_ram_channels))
+    lines.append(f'The solver is expected to be {bound_kind}-bound on this hardware{caveat}')
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 # ----- Define Program Execution ------------------------------------------------------------------------------------ #
 
 if __name__ == '__main__':
-    print(f'Checking the various possible hardware bottlenecks for a simulation with {NUM_CELLS:,} cells')
-
-    estimate_cfd_requirements(
-        num_cells=NUM_CELLS,
-        ram_capacity_gb=RAM_CAPACITY_GB,
-        num_ram_channels=NUM_RAM_CHANNELS,
-        ram_speed_mts=RAM_SPEED_MTS,
-        num_processors=NUM_PROCESSORS,
-        num_cpu_cores=NUM_CPU_CORES_PER_PROCESSOR,
-        cpu_speed_ghz=CPU_SPEED_GHZ,
-        cpu_l3_cache_capacity_mb=L3_CACHE_CAPACITY_MB_PER_PROCESSOR,
-        gpu_vram_gb=GPU_VRAM_GB)
+    estimate_cfd_requirements(HARDWARE)